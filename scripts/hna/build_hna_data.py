@@ -6,21 +6,55 @@ Colorado counties/places. Designed to be resilient: external API failures
 are non-fatal; partial outputs are produced with warnings.
 """
 
+import asyncio
+import contextlib
+import functools
+import hashlib
 import io
+import json
 import logging
 import os
+import re
+import shutil
 import sys
 import time
 from datetime import datetime, timezone
 
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:  # optional: faster JSON parsing/serialisation
+    import orjson
+except ImportError:  # pragma: no cover - falls back to stdlib json
+    orjson = None
+
+try:  # optional: fast multi-threaded LEHD parsing
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:  # pragma: no cover - falls back to pandas' parser
+    pa = None
+
+try:  # optional: concurrent Census fetches (pip install "httpx[http2]")
+    import httpx
+except ImportError:  # pragma: no cover - falls back to sequential requests
+    httpx = None
+
+try:  # optional: HTTP/2 for the httpx client; HTTP/1.1 keep-alive otherwise
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover - depends on the environment
+    HTTP2_AVAILABLE = False
 
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s %(levelname)s %(message)s",
 )
 log = logging.getLogger(__name__)
+# httpx logs every request URL at INFO, which would leak the Census API key
+logging.getLogger("httpx").setLevel(logging.WARNING)
 
 # ---------------------------------------------------------------------------
 # Constants
@@ -35,7 +69,72 @@ DOLA_SOURCE_CSV = "data/hna/source/dola_sya_county.csv"
 CENSUS_BASE = "https://api.census.gov/data"
 LEHD_BASE = "https://lehd.ces.census.gov/data/lodes/LODES8"
 
+CO_STATE_FIPS = "08"
+# Colorado county FIPS: odd numbers 001..123 (64 counties total)
+_CO_COUNTY_FIPS = tuple(f"{fips:03d}" for fips in range(1, 124, 2))
+# Census API limit on variables per ``get=`` clause
+CENSUS_MAX_VARIABLES = 50
+
 OUTPUT_DIR = "data/hna/output"
+CACHE_DIR = "data/hna/cache"
+
+# Response cache lifetimes (seconds); sources update at most annually
+ACS_CACHE_TTL = 24 * 3600
+LEHD_CACHE_TTL = 7 * 24 * 3600
+
+USER_AGENT = "Housing-Data-Analytics/hna-build"
+
+# Retry policy for the shared session (status retries honour Retry-After)
+HTTP_RETRIES = 3
+HTTP_BACKOFF = 1.7
+HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Max concurrent connections for the async Census client
+ASYNC_MAX_CONNECTIONS = 32
+
+# LODES WAC job-count columns (all integer counts)
+LEHD_WAC_COUNT_COLUMNS = (
+    ["C000", "CA01", "CA02", "CA03", "CE01", "CE02", "CE03"]
+    + [f"CNS{i:02d}" for i in range(1, 21)]
+    + ["CR01", "CR02", "CR03", "CR04", "CR05", "CR07", "CT01", "CT02"]
+    + ["CD01", "CD02", "CD03", "CD04", "CS01", "CS02"]
+    + [f"CFA{i:02d}" for i in range(1, 6)]
+    + [f"CFS{i:02d}" for i in range(1, 6)]
+)
+LEHD_READ_BLOCK_SIZE = 8 << 20  # 8 MiB per pyarrow parse block
+# Rows per chunk for the low-memory reader; parse time was flat from 128K
+# to 1M rows while peak memory grew with chunk size, so use the smallest
+LEHD_CHUNK_ROWS = 131_072
+# Politeness cap on simultaneous LEHD downloads
+LEHD_MAX_CONCURRENT_DOWNLOADS = 4
+
+# Upper bounds on the leading lines/bytes inspected for CSV banner rows
+BANNER_MAX_LINES = 32
+BANNER_SNIFF_BYTES = 8192
+
+_KEY_REDACT_RE = re.compile(r"(key=)[^&\s]+")
+
+# ---------------------------------------------------------------------------
+# Shared HTTP session
+# ---------------------------------------------------------------------------
+# One pooled, keep-alive session for every outbound request so repeated
+# Census/DOLA/LEHD calls reuse TCP+TLS connections instead of reconnecting.
+# Retries with backoff are handled by urllib3 underneath every request.
+
+_SESSION = requests.Session()
+_SESSION.headers.update({"User-Agent": USER_AGENT})
+_RETRY = Retry(
+    total=HTTP_RETRIES,
+    backoff_factor=HTTP_BACKOFF,
+    status_forcelist=HTTP_RETRY_STATUSES,
+    allowed_methods=["HEAD", "GET"],
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+_ADAPTER = HTTPAdapter(pool_connections=16, pool_maxsize=64,
+                       max_retries=_RETRY)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
 
 # ---------------------------------------------------------------------------
 # Utility helpers
@@ -49,69 +148,181 @@ def utc_now_z() -> str:
 
 def redact(s: str) -> str:
     """Redact Census API keys and other secrets from log strings."""
-    import re
-    return re.sub(r"(key=)[^&\s]+", r"\1***", str(s))
+    return _KEY_REDACT_RE.sub(r"\1***", str(s))
+
+
+def _json_loads(data: bytes):
+    """Parse JSON *data* with orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj, indent: bool = False) -> bytes:
+    """Serialise *obj* to JSON bytes with orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None).encode("utf-8")
+
+
+def _cache_path(key, cache_dir: str = CACHE_DIR) -> str:
+    """Return the cache file path for *key* (a blake2b hash of its JSON)."""
+    raw = json.dumps(key, sort_keys=True, default=str).encode("utf-8")
+    digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+    return os.path.join(cache_dir, f"{digest}.json")
+
+
+def _cache_get(key, ttl: float | None = None, cache_dir: str = CACHE_DIR):
+    """Return the cached JSON value for *key*, or None if missing/expired.
+
+    *ttl* is a maximum age in seconds based on file mtime; None never expires.
+    """
+    path = _cache_path(key, cache_dir)
+    try:
+        if ttl is not None and time.time() - os.path.getmtime(path) > ttl:
+            return None
+        with open(path, "rb") as fh:
+            return _json_loads(fh.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _cache_set(key, value, cache_dir: str = CACHE_DIR) -> None:
+    """Store *value* as JSON under *key*. Failures are logged, not raised."""
+    path = _cache_path(key, cache_dir)
+    tmp = path + ".part"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp, "wb") as fh:
+            fh.write(_json_dumps(value))
+        os.replace(tmp, path)
+    except (OSError, TypeError, ValueError) as exc:
+        log.warning("Cache write failed for %s: %s", path, exc)
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+
+
+@functools.lru_cache(maxsize=None)
+def _retry_session(retries: int, backoff: float) -> requests.Session:
+    """Return a session like ``_SESSION`` with its own retry policy (cached)."""
+    session = requests.Session()
+    session.headers.update(_SESSION.headers)
+    adapter = HTTPAdapter(
+        max_retries=_RETRY.new(total=retries, backoff_factor=backoff))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _session_for(retries: int | None = None,
+                 backoff: float | None = None) -> requests.Session:
+    """Return the session for per-call *retries*/*backoff* overrides.
+
+    None means the default (``HTTP_RETRIES`` / ``HTTP_BACKOFF``); the shared
+    ``_SESSION`` is used unless an override differs from it.
+    """
+    retries = HTTP_RETRIES if retries is None else retries
+    backoff = HTTP_BACKOFF if backoff is None else backoff
+    if retries == HTTP_RETRIES and backoff == HTTP_BACKOFF:
+        return _SESSION
+    return _retry_session(retries, backoff)
 
 
-def http_get_text(url: str, timeout: int = 30, retries: int = 3,
-                  backoff: float = 1.7) -> str:
+def http_get_text(url: str, timeout: int = 30, retries: int | None = None,
+                  backoff: float | None = None) -> str:
     """GET *url* and return the response body as text.
 
-    Retries with exponential backoff on connection/timeout errors.
+    Transient failures are retried by the session's urllib3 ``Retry``.
+    *retries* (retries after the first attempt) and *backoff* (urllib3
+    ``backoff_factor``) override ``HTTP_RETRIES`` / ``HTTP_BACKOFF``.
     Raises on HTTP error after all retries are exhausted.
     """
-    last_exc: Exception = RuntimeError("No attempts made")
-    for attempt in range(retries):
-        try:
-            resp = requests.get(url, timeout=timeout)
-            resp.raise_for_status()
-            return resp.text
-        except requests.RequestException as exc:
-            last_exc = exc
-            if attempt < retries - 1:
-                wait = backoff ** attempt
-                log.warning(
-                    "http_get_text attempt %d/%d failed for %s: %s – "
-                    "retrying in %.1fs",
-                    attempt + 1, retries, redact(url), exc, wait,
-                )
-                time.sleep(wait)
-    raise last_exc
+    resp = _session_for(retries, backoff).get(url, timeout=timeout)
+    resp.raise_for_status()
+    return resp.text
+
+
+def http_get_json(url: str, timeout: int = 30, retries: int | None = None,
+                  backoff: float | None = None):
+    """GET *url* and return parsed JSON, or *None* on any error (non-fatal).
+
+    Retries and the *retries*/*backoff* overrides are as for
+    :func:`http_get_text`.
+    """
+    try:
+        resp = _session_for(retries, backoff).get(url, timeout=timeout)
+        resp.raise_for_status()
+        return _json_loads(resp.content)
+    except (requests.RequestException, ValueError) as exc:
+        log.error("http_get_json failed for %s: %s", redact(url), redact(exc))
+        return None
 
 
-def http_get_json(url: str, timeout: int = 30, retries: int = 3,
-                  backoff: float = 1.7):
-    """GET *url* and return parsed JSON, or *None* on any error (non-fatal)."""
-    last_exc: Exception = RuntimeError("No attempts made")
-    for attempt in range(retries):
+def _retry_delay(retry_number: int, retry_after: str | None = None) -> float:
+    """Seconds to wait before retry *retry_number* (1-based), as ``_RETRY`` does.
+
+    A ``Retry-After`` header, when present and valid, takes precedence.
+    """
+    if retry_after:
+        with contextlib.suppress(Exception):
+            return _RETRY.parse_retry_after(retry_after)
+    if retry_number <= 1:
+        return 0.0
+    return min(_RETRY.backoff_max, HTTP_BACKOFF * 2 ** (retry_number - 1))
+
+
+async def _async_get_with_retry(client, url: str, timeout: int, consume):
+    """Stream a GET of *url* and return ``await consume(resp)``.
+
+    Applies the session's retry policy to an httpx client: transport errors
+    and ``HTTP_RETRY_STATUSES`` are retried up to ``HTTP_RETRIES`` times,
+    honouring ``Retry-After``. Any other HTTP error raises immediately.
+    """
+    for attempt in range(HTTP_RETRIES + 1):
+        retry_after = None
         try:
-            resp = requests.get(url, timeout=timeout)
-            resp.raise_for_status()
-            return resp.json()
-        except requests.RequestException as exc:
-            last_exc = exc
-            if attempt < retries - 1:
-                wait = backoff ** attempt
-                log.warning(
-                    "http_get_json attempt %d/%d failed for %s: %s – "
-                    "retrying in %.1fs",
-                    attempt + 1, retries, redact(url), exc, wait,
-                )
-                time.sleep(wait)
-    log.error("http_get_json all retries failed for %s: %s",
-              redact(url), last_exc)
-    return None
+            async with client.stream("GET", url, timeout=timeout) as resp:
+                if (resp.status_code not in HTTP_RETRY_STATUSES
+                        or attempt == HTTP_RETRIES):
+                    resp.raise_for_status()
+                    return await consume(resp)
+                retry_after = resp.headers.get("Retry-After")
+                reason = f"HTTP {resp.status_code}"
+        except httpx.TransportError as exc:
+            if attempt == HTTP_RETRIES:
+                raise
+            reason = exc
+        wait = _retry_delay(attempt + 1, retry_after)
+        log.warning("GET %s failed (%s) – retry %d/%d in %.1fs",
+                    redact(url), redact(reason), attempt + 1, HTTP_RETRIES,
+                    wait)
+        await asyncio.sleep(wait)
+
+
+async def _read_json(resp):
+    """Read and parse the body of an httpx response as JSON."""
+    return _json_loads(await resp.aread())
+
+
+async def http_get_json_async(client, url: str, timeout: int = 30):
+    """Async counterpart of :func:`http_get_json` using an httpx client.
+
+    Retries follow the same policy as the shared session.
+    """
+    try:
+        return await _async_get_with_retry(client, url, timeout, _read_json)
+    except (httpx.HTTPError, ValueError) as exc:
+        log.error("http_get_json_async failed for %s: %s",
+                  redact(url), redact(exc))
+        return None
 
 
-def read_csv_with_banner_skip(path: str, encoding: str = "utf-8") -> pd.DataFrame:
-    """Read a CSV, automatically skipping leading banner rows.
+def _count_banner_rows(lines) -> int:
+    """Count leading banner rows in *lines* (an iterable of text lines).
 
     Banner rows are lines where the first cell does not look like a column
     header or numeric value – e.g. "Vintage 2023 county estimates...".
     """
-    with open(path, encoding=encoding) as fh:
-        lines = fh.readlines()
-
     skip = 0
     for line in lines:
         first_cell = line.split(",")[0].strip().strip('"')
@@ -124,12 +335,25 @@ def read_csv_with_banner_skip(path: str, encoding: str = "utf-8") -> pd.DataFram
             skip += 1
         else:
             break
+    return skip
+
+
+def read_csv_with_banner_skip(path: str, encoding: str = "utf-8") -> pd.DataFrame:
+    """Read a CSV, automatically skipping leading banner rows.
+
+    See :func:`_count_banner_rows` for what counts as a banner.
+    """
+    # Banners only ever occupy the first few lines; sniff a fixed-size head
+    with open(path, "rb") as fh:
+        head = fh.read(BANNER_SNIFF_BYTES).decode(encoding, errors="replace")
+    skip = _count_banner_rows(head.splitlines()[:BANNER_MAX_LINES])
 
     if skip:
         log.info("read_csv_with_banner_skip: skipping %d banner row(s) in %s",
                  skip, path)
 
-    return pd.read_csv(path, skiprows=skip, encoding=encoding)
+    return pd.read_csv(path, skiprows=skip, encoding=encoding,
+                       engine="c", low_memory=False)
 
 
 # ---------------------------------------------------------------------------
@@ -137,55 +361,180 @@ def read_csv_with_banner_skip(path: str, encoding: str = "utf-8") -> pd.DataFram
 # ---------------------------------------------------------------------------
 
 
+def _http_validator(headers) -> str | None:
+    """Return the ETag (or Last-Modified) header used to detect changes."""
+    return headers.get("ETag") or headers.get("Last-Modified")
+
+
 def download_dola_sya(dest: str = DOLA_SOURCE_CSV) -> bool:
     """Download the DOLA SYA county CSV to *dest*.
 
+    Skips the download when *dest* exists and a HEAD request reports the
+    same ETag/Last-Modified as the copy on disk.
     Returns True on success, False on failure (non-fatal).
     """
     os.makedirs(os.path.dirname(dest), exist_ok=True)
+    cache_key = ("dola", DOLA_SYA_URL, os.path.abspath(dest))
+    if os.path.exists(dest):
+        try:
+            head = _SESSION.head(DOLA_SYA_URL, timeout=30,
+                                 allow_redirects=True)
+            head.raise_for_status()
+            validator = _http_validator(head.headers)
+            if validator and validator == _cache_get(cache_key):
+                log.info("DOLA SYA unchanged (%s) – using %s", validator, dest)
+                return True
+        except requests.RequestException as exc:
+            log.info("DOLA SYA HEAD check failed (%s) – downloading", exc)
+
     log.info("Downloading DOLA SYA from %s", DOLA_SYA_URL)
+    tmp = dest + ".part"
     try:
-        text = http_get_text(DOLA_SYA_URL)
-        with open(dest, "w", encoding="utf-8") as fh:
-            fh.write(text)
+        # Stream straight to disk; only replace the cached copy once complete
+        with _SESSION.get(DOLA_SYA_URL, stream=True, timeout=60) as resp:
+            resp.raise_for_status()
+            resp.raw.decode_content = True
+            with open(tmp, "wb") as fh:
+                shutil.copyfileobj(resp.raw, fh)
+            validator = _http_validator(resp.headers)
+        os.replace(tmp, dest)
+        # Store None when the response has no validator so a stale one
+        # cannot match a later HEAD
+        _cache_set(cache_key, validator)
         log.info("DOLA SYA saved to %s", dest)
         return True
     except Exception as exc:
         log.warning("DOLA SYA download failed: %s", exc)
+        if os.path.exists(tmp):
+            os.remove(tmp)
         return False
 
 
-def load_dola_sya(cache: str = DOLA_SOURCE_CSV) -> pd.DataFrame | None:
+class _PrefixedStream(io.RawIOBase):
+    """Raw stream that replays *head* bytes before continuing with *raw*."""
+
+    def __init__(self, head: bytes, raw):
+        self._head = memoryview(head)
+        self._raw = raw
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buf) -> int:
+        """Fill *buf* from the remaining head first, then from the raw stream."""
+        if self._head:
+            n = min(len(buf), len(self._head))
+            buf[:n] = self._head[:n]
+            self._head = self._head[n:]
+            return n
+        data = self._raw.read(len(buf))
+        buf[:len(data)] = data
+        return len(data)
+
+
+def _read_head(raw, size: int) -> bytes:
+    """Read from *raw* until *size* bytes or EOF, however short its reads."""
+    head = b""
+    while len(head) < size:
+        chunk = raw.read(size - len(head))
+        if not chunk:
+            break
+        head += chunk
+    return head
+
+
+def _stream_dola_sya(encoding: str = "utf-8") -> pd.DataFrame:
+    """Download and parse the DOLA SYA CSV in one pass, without touching disk.
+
+    Banner rows are counted from the first ``BANNER_SNIFF_BYTES`` of the
+    stream, the same head :func:`read_csv_with_banner_skip` inspects.
+    Raises on download or parse failure.
+    """
+    log.info("Streaming DOLA SYA from %s", DOLA_SYA_URL)
+    with _SESSION.get(DOLA_SYA_URL, stream=True, timeout=60) as resp:
+        resp.raise_for_status()
+        resp.raw.decode_content = True
+        head = _read_head(resp.raw, BANNER_SNIFF_BYTES)
+        skip = _count_banner_rows(
+            head.decode(encoding, errors="replace").splitlines()[:BANNER_MAX_LINES]
+        )
+        if skip:
+            log.info("_stream_dola_sya: skipping %d banner row(s)", skip)
+        stream = io.BufferedReader(_PrefixedStream(head, resp.raw))
+        return pd.read_csv(stream, skiprows=skip, encoding=encoding,
+                           engine="c", low_memory=False)
+
+
+def load_dola_sya(cache: str | None = DOLA_SOURCE_CSV,
+                  persist: bool = True) -> pd.DataFrame | None:
     """Return the DOLA SYA DataFrame, using cache when download fails.
 
+    With *persist* (the default) the CSV is downloaded to *cache* and parsed
+    from there. When *persist* is False or *cache* is None the response is
+    parsed straight from the HTTP stream and nothing is written; an existing
+    *cache* file is still used as a fallback if streaming fails.
     Returns None if neither download nor cache is available (non-fatal).
     """
-    success = download_dola_sya(cache)
-    if not success:
-        if os.path.exists(cache):
+    if cache is None or not persist:
+        try:
+            return _categorize_county(_stream_dola_sya())
+        except Exception as exc:
+            log.warning("DOLA SYA stream failed: %s", exc)
+            if cache is None or not os.path.exists(cache):
+                log.warning(
+                    "DOLA SYA unavailable and no cache found – skipping SYA build"
+                )
+                return None
             log.warning("Using cached DOLA file: %s", cache)
-        else:
-            log.warning(
-                "DOLA SYA unavailable and no cache found – skipping SYA build"
-            )
-            return None
+    else:
+        success = download_dola_sya(cache)
+        if not success:
+            if os.path.exists(cache):
+                log.warning("Using cached DOLA file: %s", cache)
+            else:
+                log.warning(
+                    "DOLA SYA unavailable and no cache found – skipping SYA build"
+                )
+                return None
 
     try:
-        return read_csv_with_banner_skip(cache)
+        return _categorize_county(read_csv_with_banner_skip(cache))
     except Exception as exc:
         log.warning("Failed to parse DOLA SYA CSV (%s): %s – skipping SYA build",
                     cache, exc)
         return None
 
 
+def _categorize_county(df: pd.DataFrame) -> pd.DataFrame:
+    """Store the SYA ``county`` column as lowercased categories, in place.
+
+    Lets :func:`build_dola_sya_by_county` match a county by category code
+    instead of lowercasing the whole column on every call.
+    """
+    if "county" in df and pd.api.types.is_string_dtype(df["county"].dtype):
+        df["county"] = df["county"].str.lower().astype("category")
+    return df
+
+
 def build_dola_sya_by_county(county: str,
                               df: pd.DataFrame | None = None) -> pd.DataFrame | None:
-    """Filter the SYA DataFrame for *county*. Non-fatal if df is None."""
+    """Filter the SYA DataFrame for *county*. Non-fatal if df is None.
+
+    Returns a new frame (boolean ``.loc`` selection copies), so callers may
+    modify it without affecting *df*.
+    """
     if df is None:
         log.info("Skipped SYA build for %s (no data)", county)
         return None
+    col = df.get("county")
+    if col is not None and isinstance(col.dtype, pd.CategoricalDtype):
+        try:
+            code = col.cat.categories.get_loc(county.lower())
+        except KeyError:
+            return df.iloc[0:0].copy()
+        return df.loc[col.cat.codes == code]
     mask = df.get("county", pd.Series(dtype=str)).str.lower() == county.lower()
-    return df[mask].copy()
+    return df.loc[mask]
 
 
 # ---------------------------------------------------------------------------
@@ -193,64 +542,257 @@ def build_dola_sya_by_county(county: str,
 # ---------------------------------------------------------------------------
 
 
-def _census_get(dataset: str, year: int, variables: str,
-                geo: str, key: str | None = None) -> list | None:
-    """Low-level Census API call; returns raw JSON list or None."""
+# Fallback chains, tried in order until one dataset returns data
+ACS_PROFILE_DATASETS = (
+    "acs/acs1/profile",
+    "acs/acs1/subject",
+    "acs/acs5/profile",
+    "acs/acs5/subject",
+)
+ACS_S0801_DATASETS = (
+    "acs/acs1/subject",
+    "acs/acs5/subject",
+)
+
+
+def county_geo(county: str, state: str = CO_STATE_FIPS) -> str:
+    """Return the Census ``for=`` geography clause for a county FIPS code."""
+    return f"county:{county}&in=state:{state}"
+
+
+def _census_url(dataset: str, year: int, variables: str,
+                geo: str, key: str | None = None) -> str:
+    """Build the Census API URL for *variables* at *geo*."""
     params = f"get={variables}&for={geo}"
     if key:
         params += f"&key={key}"
-    url = f"{CENSUS_BASE}/{year}/{dataset}?{params}"
-    log.info("Census request: %s", redact(url))
-    data = http_get_json(url)
-    if data is None or not isinstance(data, list):
+    return f"{CENSUS_BASE}/{year}/{dataset}?{params}"
+
+
+def _is_census_table(data) -> bool:
+    """O(1) shape check for a Census response: a list led by a header row.
+
+    The full per-row check only runs under DEBUG logging.
+    """
+    if not isinstance(data, list) or not data or not isinstance(data[0], list):
+        return False
+    if __debug__ and log.isEnabledFor(logging.DEBUG):
+        assert all(isinstance(row, list) for row in data)
+    return True
+
+
+# The Census helpers below are written once as generators that yield each
+# URL to fetch and receive the parsed JSON (or None) back. _drive() runs
+# them with the blocking session, _drive_async() with an httpx client, so
+# caching, batching and fallback logic is shared by both paths.
+
+
+def _drive(plan, fetch):
+    """Run a request *plan* to completion, fetching each URL with *fetch*."""
+    try:
+        url = next(plan)
+        while True:
+            url = plan.send(fetch(url))
+    except StopIteration as stop:
+        return stop.value
+
+
+async def _drive_async(plan, fetch):
+    """Async :func:`_drive`; *fetch* is a coroutine function."""
+    try:
+        url = next(plan)
+        while True:
+            url = plan.send(await fetch(url))
+    except StopIteration as stop:
+        return stop.value
+
+
+def _census_plan(dataset: str, year: int, variables: str,
+                 geo: str, key: str | None = None):
+    """Request plan for one Census call, served from the cache when fresh."""
+    cache_key = ("census", dataset, year, variables, geo)
+    cached = _cache_get(cache_key, ttl=ACS_CACHE_TTL)
+    if cached is not None:
+        return cached
+    url = _census_url(dataset, year, variables, geo, key)
+    if log.isEnabledFor(logging.INFO):
+        log.info("Census request: %s", redact(url))
+    data = yield url
+    if not _is_census_table(data):
         return None
+    _cache_set(cache_key, data)
     return data
 
 
-def fetch_acs_profile(geo: str, variables: str, year: int,
+def _census_get(dataset: str, year: int, variables: str,
+                geo: str, key: str | None = None) -> list | None:
+    """Low-level Census API call; returns raw JSON list or None.
+
+    Successful responses are cached on disk for ``ACS_CACHE_TTL`` seconds.
+    """
+    return _drive(_census_plan(dataset, year, variables, geo, key),
+                  http_get_json)
+
+
+def _split_variables(variables: str | list[str]) -> list[list[str]]:
+    """Split *variables* into chunks that fit in one Census request."""
+    if isinstance(variables, str):
+        variables = [v for v in variables.split(",") if v]
+    return [list(variables[i:i + CENSUS_MAX_VARIABLES])
+            for i in range(0, len(variables), CENSUS_MAX_VARIABLES)]
+
+
+def _merge_census_tables(tables: list[list]) -> list:
+    """Join Census JSON tables column-wise on their geography columns.
+
+    The first table is kept whole. Later tables contribute only the
+    columns not already present (the geography key columns such as
+    ``state``/``county`` repeat in every table).
+    """
+    merged = tables[0]
+    for table in tables[1:]:
+        header = table[0]
+        key_cols = [c for c in header if c in merged[0]]
+        extra = [i for i, c in enumerate(header) if c not in merged[0]]
+        m_idx = [merged[0].index(c) for c in key_cols]
+        t_idx = [header.index(c) for c in key_cols]
+        rows = {tuple(r[i] for i in t_idx): r for r in table[1:]}
+        out = [merged[0] + [header[i] for i in extra]]
+        for row in merged[1:]:
+            match = rows.get(tuple(row[i] for i in m_idx))
+            if match is None:
+                continue
+            out.append(row + [match[i] for i in extra])
+        merged = out
+    return merged
+
+
+def _census_batched_plan(dataset: str, year: int, variables: str | list[str],
+                         geo: str, key: str | None = None):
+    """Request plan fetching any number of *variables* in as few calls as
+    possible. Returns the merged JSON table, or None if any chunk fails
+    or there are no variables.
+    """
+    chunks = _split_variables(variables)
+    if not chunks:
+        log.error("No Census variables requested from %s/%d", dataset, year)
+        return None
+    tables = []
+    for chunk in chunks:
+        data = yield from _census_plan(dataset, year, ",".join(chunk),
+                                       geo, key)
+        if data is None:
+            return None
+        tables.append(data)
+    return _merge_census_tables(tables)
+
+
+def _fallback_plan(name: str, datasets, geo: str,
+                   variables: str | list[str], year: int,
+                   key: str | None = None):
+    """Request plan trying *datasets* in order until one returns data."""
+    if not _split_variables(variables):
+        log.error("%s: no variables requested for geo=%s", name, geo)
+        return None
+    for dataset in datasets:
+        result = yield from _census_batched_plan(dataset, year, variables,
+                                                 geo, key)
+        if result is not None:
+            log.info("%s succeeded with %s/%d", name, dataset, year)
+            return result
+        log.warning("%s: %s/%d returned no data, trying next fallback",
+                    name, dataset, year)
+    log.error("%s: all fallbacks exhausted for geo=%s", name, geo)
+    return None
+
+
+def fetch_acs_profile(geo: str, variables: list[str], year: int,
                       key: str | None = None) -> list | None:
     """Fetch ACS profile data with fallback chain.
 
     Tries in order: ACS1/profile → ACS1/subject → ACS5/profile → ACS5/subject.
+    *variables* may be any length; they are batched into as few requests
+    as the Census API allows per dataset.
     Returns raw Census JSON list or None if all fail (non-fatal).
     """
-    attempts = [
-        (f"acs/acs1/profile", year),
-        (f"acs/acs1/subject", year),
-        (f"acs/acs5/profile", year),
-        (f"acs/acs5/subject", year),
-    ]
-    for dataset, yr in attempts:
-        result = _census_get(dataset, yr, variables, geo, key)
-        if result is not None:
-            log.info("fetch_acs_profile succeeded with %s/%d", dataset, yr)
-            return result
-        log.warning("fetch_acs_profile: %s/%d returned no data, trying next",
-                    dataset, yr)
-    log.error("fetch_acs_profile: all fallbacks exhausted for geo=%s", geo)
-    return None
+    plan = _fallback_plan("fetch_acs_profile", ACS_PROFILE_DATASETS,
+                          geo, variables, year, key)
+    return _drive(plan, http_get_json)
 
 
-def fetch_acs_s0801(geo: str, variables: str, year: int,
+async def fetch_acs_profile_async(client, geo: str, variables: list[str],
+                                  year: int,
+                                  key: str | None = None) -> list | None:
+    """Async :func:`fetch_acs_profile`; the fallback chain stays sequential."""
+    plan = _fallback_plan("fetch_acs_profile", ACS_PROFILE_DATASETS,
+                          geo, variables, year, key)
+    return await _drive_async(
+        plan, lambda url: http_get_json_async(client, url))
+
+
+def fetch_acs_s0801(geo: str, variables: list[str], year: int,
                     key: str | None = None) -> list | None:
     """Fetch ACS S0801 (commuting) data.
 
     Tries: ACS1/subject → ACS5/subject.
     Returns raw Census JSON list or None if all fail (non-fatal).
     """
-    attempts = [
-        ("acs/acs1/subject", year),
-        ("acs/acs5/subject", year),
-    ]
-    for dataset, yr in attempts:
-        result = _census_get(dataset, yr, variables, geo, key)
-        if result is not None:
-            log.info("fetch_acs_s0801 succeeded with %s/%d", dataset, yr)
-            return result
-        log.warning("fetch_acs_s0801: %s/%d returned no data, trying next fallback",
-                    dataset, yr)
-    log.error("fetch_acs_s0801: all fallbacks exhausted for geo=%s", geo)
-    return None
+    plan = _fallback_plan("fetch_acs_s0801", ACS_S0801_DATASETS,
+                          geo, variables, year, key)
+    return _drive(plan, http_get_json)
+
+
+async def _fetch_acs_profiles_async(counties, variables: list[str],
+                                    year: int, key: str | None = None,
+                                    transport=None) -> list:
+    """Gather :func:`fetch_acs_profile_async` for *counties* on one client."""
+    limits = httpx.Limits(max_connections=ASYNC_MAX_CONNECTIONS,
+                          max_keepalive_connections=ASYNC_MAX_CONNECTIONS)
+    async with httpx.AsyncClient(http2=HTTP2_AVAILABLE, limits=limits,
+                                 transport=transport,
+                                 headers={"User-Agent": USER_AGENT}) as client:
+        return await asyncio.gather(
+            *[fetch_acs_profile_async(client, county_geo(county), variables,
+                                      year, key)
+              for county in counties],
+            return_exceptions=True,
+        )
+
+
+def fetch_acs_profiles_by_county(counties, variables: list[str], year: int,
+                                 key: str | None = None,
+                                 transport=None) -> dict:
+    """Fetch ACS profiles for every county in *counties*.
+
+    Counties are fetched concurrently when httpx is installed (over HTTP/2
+    when ``h2`` is also available), otherwise one after another.
+    *transport* is an optional ``httpx.AsyncBaseTransport`` for the
+    concurrent client. Returns ``{county: census_json}`` for the counties
+    that succeeded (non-fatal).
+    """
+    if httpx is not None:
+        try:
+            results = asyncio.run(
+                _fetch_acs_profiles_async(counties, variables, year, key,
+                                          transport)
+            )
+        except Exception as exc:
+            log.warning("Concurrent ACS fetch failed (%s) – falling back to "
+                        "sequential requests", exc)
+            results = [fetch_acs_profile(county_geo(c), variables, year, key)
+                       for c in counties]
+    else:
+        results = [fetch_acs_profile(county_geo(c), variables, year, key)
+                   for c in counties]
+
+    profiles = {}
+    for county, result in zip(counties, results):
+        if isinstance(result, Exception):
+            log.warning("fetch_acs_profile failed for county %s: %s",
+                        county, result)
+        elif result is not None:
+            profiles[county] = result
+    return profiles
 
 
 # ---------------------------------------------------------------------------
@@ -258,37 +800,218 @@ def fetch_acs_s0801(geo: str, variables: str, year: int,
 # ---------------------------------------------------------------------------
 
 
+def _lehd_target(state: str, year: int, dest_dir: str) -> tuple[str, str]:
+    """Return ``(url, dest)`` for the LODES WAC file of *state*/*year*."""
+    filename = f"{state.lower()}_wac_S000_JT00_{year}.csv.gz"
+    url = f"{LEHD_BASE}/{state.lower()}/wac/{filename}"
+    return url, os.path.join(dest_dir, filename)
+
+
+def _lehd_is_fresh(dest: str) -> bool:
+    """Return True if *dest* exists and is younger than ``LEHD_CACHE_TTL``."""
+    return (os.path.exists(dest)
+            and time.time() - os.path.getmtime(dest) <= LEHD_CACHE_TTL)
+
+
 def download_lehd(state: str, year: int, dest_dir: str = OUTPUT_DIR) -> str:
     """Download LEHD LODES WAC file for *state*/*year*.
 
+    A copy in *dest_dir* younger than ``LEHD_CACHE_TTL`` is reused.
     This is a critical data source – raises on failure.
     """
     os.makedirs(dest_dir, exist_ok=True)
-    filename = f"{state.lower()}_wac_S000_JT00_{year}.csv.gz"
-    url = f"{LEHD_BASE}/{state.lower()}/wac/{filename}"
-    dest = os.path.join(dest_dir, filename)
+    url, dest = _lehd_target(state, year, dest_dir)
+    if _lehd_is_fresh(dest):
+        log.info("Using cached LEHD file %s", dest)
+        return dest
     log.info("Downloading LEHD from %s", url)
-    # Use http_get_text with longer timeout for large file
-    resp = requests.get(url, timeout=120, stream=True)
-    resp.raise_for_status()
-    with open(dest, "wb") as fh:
-        for chunk in resp.iter_content(chunk_size=65536):
-            fh.write(chunk)
+    # Write via a temp file so an interrupted download is never reused
+    tmp = dest + ".part"
+    try:
+        with _SESSION.get(url, timeout=120, stream=True) as resp:
+            resp.raise_for_status()
+            with open(tmp, "wb") as fh:
+                for chunk in resp.iter_content(chunk_size=65536):
+                    fh.write(chunk)
+        os.replace(tmp, dest)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    log.info("LEHD saved to %s (%s)", dest, utc_now_z())
+    return dest
+
+
+async def download_lehd_async(client, state: str, year: int,
+                              dest_dir: str = OUTPUT_DIR,
+                              semaphore: asyncio.Semaphore | None = None) -> str:
+    """Async :func:`download_lehd` over an httpx client. Raises on failure.
+
+    Retries follow the same policy as the shared session.
+    *semaphore*, when given, bounds how many downloads run at once.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    url, dest = _lehd_target(state, year, dest_dir)
+    if _lehd_is_fresh(dest):
+        log.info("Using cached LEHD file %s", dest)
+        return dest
+    tmp = dest + ".part"
+
+    async def write(resp):
+        """Stream the response body into the temp file."""
+        with open(tmp, "wb") as fh:
+            async for chunk in resp.aiter_bytes(65536):
+                fh.write(chunk)
+
+    async with semaphore or contextlib.nullcontext():
+        log.info("Downloading LEHD from %s", url)
+        try:
+            await _async_get_with_retry(client, url, 120, write)
+            os.replace(tmp, dest)
+        except BaseException:  # includes cancellation by a failed sibling
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
     log.info("LEHD saved to %s (%s)", dest, utc_now_z())
     return dest
 
 
+async def _download_lehd_states_async(states, year: int, dest_dir: str,
+                                      transport=None) -> list[str]:
+    """Gather :func:`download_lehd_async` for *states* on one client.
+
+    If any download fails, the others are cancelled and awaited (so their
+    partial files are removed) before the client closes and the first
+    error is raised.
+    """
+    semaphore = asyncio.Semaphore(LEHD_MAX_CONCURRENT_DOWNLOADS)
+    async with httpx.AsyncClient(headers={"User-Agent": USER_AGENT},
+                                 follow_redirects=True,
+                                 transport=transport) as client:
+        tasks = [asyncio.create_task(
+                     download_lehd_async(client, state, year, dest_dir,
+                                         semaphore))
+                 for state in states]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+
+def download_lehd_states(states, year: int,
+                         dest_dir: str = OUTPUT_DIR) -> list[str]:
+    """Download LEHD WAC files for several *states*; returns their paths.
+
+    Downloads run concurrently (at most ``LEHD_MAX_CONCURRENT_DOWNLOADS``
+    at a time) when httpx is installed, otherwise one after another.
+    This is a critical data source – raises on failure.
+    """
+    if httpx is None:
+        return [download_lehd(state, year, dest_dir) for state in states]
+    return asyncio.run(_download_lehd_states_async(states, year, dest_dir))
+
+
+def _lehd_column_types() -> dict:
+    """Arrow schema for LODES WAC columns: int32 counts, string identifiers."""
+    column_types = {"w_geocode": pa.string(), "cty": pa.string(),
+                    "createdate": pa.string()}
+    column_types.update({col: pa.int32() for col in LEHD_WAC_COUNT_COLUMNS})
+    return column_types
+
+
+def _read_lehd_arrow(lehd_path: str):
+    """Parse a gzipped LODES WAC file into a pyarrow Table."""
+    column_types = _lehd_column_types()
+    with pa.input_stream(lehd_path, compression="gzip") as stream:
+        return pa_csv.read_csv(
+            stream,
+            read_options=pa_csv.ReadOptions(block_size=LEHD_READ_BLOCK_SIZE),
+            convert_options=pa_csv.ConvertOptions(column_types=column_types),
+        )
+
+
+def load_lehd_wac(lehd_path: str, county: str | None = None) -> pd.DataFrame:
+    """Read a gzipped LODES WAC file into a DataFrame. Raises on error.
+
+    With *county*, only rows whose ``cty`` starts with it are kept (filtered
+    before conversion to pandas on the Arrow path). Columns are Arrow-backed
+    when pyarrow is installed, otherwise all ``str``.
+    """
+    if pa is not None:
+        table = _read_lehd_arrow(lehd_path)
+        if county is not None:
+            table = table.filter(pc.starts_with(table["cty"], county))
+        # Keep Arrow-backed columns rather than object-dtype strings
+        return table.to_pandas(types_mapper=pd.ArrowDtype,
+                               split_blocks=True, self_destruct=True)
+    df = pd.read_csv(lehd_path, compression="gzip", dtype=str)
+    if county is None:
+        return df
+    mask = df.get("cty", pd.Series(dtype=str)).str.startswith(county)
+    return df.loc[mask]
+
+
 def build_lehd_by_county(county: str, lehd_path: str) -> pd.DataFrame | None:
-    """Read LEHD WAC file and filter to *county*. Non-fatal on parse error."""
+    """Read LEHD WAC file and filter to *county*. Non-fatal on parse error.
+
+    Returns a new frame that callers may modify freely.
+    """
     try:
-        df = pd.read_csv(lehd_path, compression="gzip", dtype=str)
-        mask = df.get("cty", pd.Series(dtype=str)).str.startswith(county)
-        return df[mask].copy()
+        return load_lehd_wac(lehd_path, county)
     except Exception as exc:
         log.warning("build_lehd_by_county failed for %s: %s", county, exc)
         return None
 
 
+def build_lehd_by_county_chunked(county: str, lehd_path: str,
+                                chunksize: int = LEHD_CHUNK_ROWS
+                                ) -> pd.DataFrame | None:
+    """Memory-bounded :func:`build_lehd_by_county`.
+
+    Reads the WAC file *chunksize* rows at a time and keeps only the rows
+    for *county*, so peak memory is one chunk rather than the whole file.
+    Returns the same columns, dtypes and index as :func:`build_lehd_by_county`.
+    Non-fatal on parse error.
+    """
+    # Chunks are parsed with plain dtypes and only the matching rows are
+    # cast to the Arrow schema; casting every chunk is ~5x slower
+    read_dtype = str if pa is None else dict.fromkeys(
+        ("w_geocode", "cty", "createdate"), str)
+    try:
+        parts = [
+            chunk.loc[chunk["cty"].str.startswith(county)]
+            for chunk in pd.read_csv(lehd_path, compression="gzip",
+                                     dtype=read_dtype, chunksize=chunksize)
+        ]
+        if not parts:
+            parts = [pd.read_csv(lehd_path, compression="gzip",
+                                 dtype=read_dtype, nrows=0)]
+        if pa is None:
+            return pd.concat(parts)
+        df = pd.concat(parts, ignore_index=True)
+        return df.astype({col: pd.ArrowDtype(t)
+                          for col, t in _lehd_column_types().items()
+                          if col in df})
+    except Exception as exc:
+        log.warning("build_lehd_by_county_chunked failed for %s: %s",
+                    county, exc)
+        return None
+
+
+def split_lehd_by_all_counties(df: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    """Split a full LEHD WAC frame into ``{county_fips: subframe}``.
+
+    *df* is typically ``load_lehd_wac(path)``. Keys are the first five
+    characters of ``cty`` (state + county FIPS). One groupby pass replaces
+    a :func:`build_lehd_by_county` scan per county when processing every
+    county in the state.
+    """
+    return {k: v for k, v in df.groupby(df["cty"].str[:5], sort=False)}
+
+
 # ---------------------------------------------------------------------------
 # Geo-derived inputs and summary cache
 # ---------------------------------------------------------------------------
@@ -312,28 +1035,27 @@ def build_summary_cache() -> dict:
     return {}
 
 
-def write_geo_config(output_dir: str = OUTPUT_DIR) -> str:
-    """Write geo-config JSON stub. Returns path written."""
+def write_geo_config(output_dir: str = OUTPUT_DIR,
+                     timestamp: str | None = None) -> str:
+    """Write geo-config JSON stub. Returns path written.
+
+    *timestamp* is the ``generated`` value; defaults to the current time.
+    """
     os.makedirs(output_dir, exist_ok=True)
     path = os.path.join(output_dir, "geo_config.json")
-    import json
-    config = {"generated": utc_now_z(), "version": "1.0"}
-    with open(path, "w") as fh:
-        json.dump(config, fh, indent=2)
+    config = {"generated": timestamp or utc_now_z(), "version": "1.0"}
+    with open(path, "wb") as fh:
+        fh.write(_json_dumps(config, indent=True))
     log.info("geo_config written to %s", path)
     return path
 
 
-def fetch_counties() -> list:
-    """Return list of Colorado county FIPS codes to process.
+def fetch_counties() -> tuple[str, ...]:
+    """Return the Colorado county FIPS codes to process.
 
     Colorado has 64 counties with odd FIPS codes from 001 to 123.
     """
-    # Colorado county FIPS: odd numbers 001..123 (64 counties total)
-    _CO_FIPS_MIN = 1
-    _CO_FIPS_MAX = 124  # exclusive upper bound (last valid FIPS is 123)
-    _CO_FIPS_STEP = 2   # all Colorado county FIPS are odd
-    return [str(fips).zfill(3) for fips in range(_CO_FIPS_MIN, _CO_FIPS_MAX, _CO_FIPS_STEP)]
+    return _CO_COUNTY_FIPS
 
 
 # ---------------------------------------------------------------------------
@@ -343,7 +1065,8 @@ def fetch_counties() -> list:
 
 def main() -> int:
     """Run the HNA data build pipeline. Returns exit code (0 = success)."""
-    log.info("HNA build started at %s", utc_now_z())
+    run_start = utc_now_z()
+    log.info("HNA build started at %s", run_start)
 
     # --- Critical: ensure output directory exists ---
     try:
@@ -364,7 +1087,7 @@ def main() -> int:
     summary = build_summary_cache()
 
     # --- Non-critical: geo-config ---
-    write_geo_config()
+    write_geo_config(timestamp=run_start)
 
     log.info("HNA build finished at %s", utc_now_z())
     return 0
@@ -0,0 +1,545 @@
+import asyncio
+import gzip
+import io
+import os
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pandas as pd
+import pytest
+
+import build_hna_data as hna
+
+
+# ---------------------------------------------------------------------------
+# HTTP retry policy
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def http_server():
+    """Local server replying with queued ``(status, body, headers)`` tuples.
+
+    The last reply repeats once the queue runs out. Yields
+    ``(url, replies, hits)``; *hits* counts requests served.
+    """
+    replies, hits = [], []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            status, body, headers = replies[min(len(hits), len(replies)) - 1]
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/data", replies, hits
+    server.shutdown()
+    server.server_close()
+
+
+def test_session_retry_policy():
+    retry = hna._SESSION.get_adapter("https://api.census.gov").max_retries
+    assert retry.total == hna.HTTP_RETRIES == 3
+    assert retry.backoff_factor == hna.HTTP_BACKOFF
+    assert set(retry.status_forcelist) == {429, 500, 502, 503, 504}
+    assert retry.respect_retry_after_header
+    assert not retry.raise_on_status
+
+
+def test_session_for_overrides():
+    assert hna._session_for() is hna._SESSION
+    assert hna._session_for(hna.HTTP_RETRIES, hna.HTTP_BACKOFF) is hna._SESSION
+    session = hna._session_for(retries=0)
+    assert session is hna._session_for(0, hna.HTTP_BACKOFF)
+    retry = session.get_adapter("https://api.census.gov").max_retries
+    assert (retry.total, retry.backoff_factor) == (0, hna.HTTP_BACKOFF)
+    assert retry.status_forcelist == hna._RETRY.status_forcelist
+
+
+def test_http_get_json_returns_none_on_server_error(http_server):
+    url, replies, hits = http_server
+    replies.append((500, b"oops", {}))
+    assert hna.http_get_json(url, retries=1, backoff=0) is None
+    assert len(hits) == 2
+
+
+def test_http_get_json_retries_then_succeeds(http_server):
+    url, replies, hits = http_server
+    replies += [(503, b"", {"Retry-After": "0"}), (200, b'[["NAME"]]', {})]
+    assert hna.http_get_json(url, retries=2, backoff=0) == [["NAME"]]
+    assert len(hits) == 2
+
+
+def test_http_get_json_returns_none_on_invalid_body(http_server):
+    url, replies, hits = http_server
+    replies.append((200, b"<html>not json</html>", {}))
+    assert hna.http_get_json(url, retries=0) is None
+    assert len(hits) == 1
+
+
+def test_http_get_text_raises_after_retries(http_server):
+    url, replies, hits = http_server
+    replies.append((502, b"", {}))
+    with pytest.raises(hna.requests.HTTPError):
+        hna.http_get_text(url, retries=0)
+    assert len(hits) == 1
+
+
+def test_retry_delay_backoff():
+    assert hna._retry_delay(1) == 0
+    assert hna._retry_delay(2) == pytest.approx(hna.HTTP_BACKOFF * 2)
+    assert hna._retry_delay(3) == pytest.approx(hna.HTTP_BACKOFF * 4)
+
+
+def test_retry_delay_honours_retry_after():
+    assert hna._retry_delay(3, "5") == 5
+    future = formatdate(time.time() + 60, usegmt=True)
+    assert 50 < hna._retry_delay(1, future) <= 60
+    # Invalid headers fall back to the backoff schedule
+    assert hna._retry_delay(2, "soon") == pytest.approx(hna.HTTP_BACKOFF * 2)
+
+
+# ---------------------------------------------------------------------------
+# Census variable batching
+# ---------------------------------------------------------------------------
+
+
+def test_split_variables_chunks_at_census_limit():
+    variables = [f"V{i}" for i in range(hna.CENSUS_MAX_VARIABLES + 1)]
+    chunks = hna._split_variables(variables)
+    assert [len(c) for c in chunks] == [hna.CENSUS_MAX_VARIABLES, 1]
+    assert sum(chunks, []) == variables
+
+
+def test_split_variables_accepts_comma_joined_string():
+    assert hna._split_variables("NAME,B01001_001E") == [["NAME", "B01001_001E"]]
+
+
+def test_merge_census_tables_single_table_is_unchanged():
+    table = [["NAME", "state", "county"], ["Adams", "08", "001"]]
+    assert hna._merge_census_tables([table]) == table
+
+
+def test_merge_census_tables_aligns_rows_on_geography_columns():
+    first = [["NAME", "A", "state", "county"],
+             ["Adams", "1", "08", "001"],
+             ["Alamosa", "2", "08", "003"]]
+    # Same geographies in a different order
+    second = [["B", "state", "county"],
+              ["20", "08", "003"],
+              ["10", "08", "001"]]
+    assert hna._merge_census_tables([first, second]) == [
+        ["NAME", "A", "state", "county", "B"],
+        ["Adams", "1", "08", "001", "10"],
+        ["Alamosa", "2", "08", "003", "20"],
+    ]
+
+
+def test_merge_census_tables_drops_rows_missing_from_later_tables():
+    first = [["A", "state", "county"],
+             ["1", "08", "001"],
+             ["2", "08", "003"]]
+    second = [["B", "state", "county"], ["10", "08", "001"]]
+    assert hna._merge_census_tables([first, second]) == [
+        ["A", "state", "county", "B"],
+        ["1", "08", "001", "10"],
+    ]
+
+
+def test_merge_census_tables_three_chunks():
+    tables = [[[col, "state"], [col.lower(), "08"]] for col in ("A", "B", "C")]
+    assert hna._merge_census_tables(tables) == [
+        ["A", "state", "B", "C"],
+        ["a", "08", "b", "c"],
+    ]
+
+
+def test_fetch_acs_profile_without_variables_returns_none(monkeypatch):
+    monkeypatch.setattr(hna, "http_get_json", lambda url: pytest.fail(url))
+    assert hna.fetch_acs_profile(hna.county_geo("001"), [], 2023) is None
+    assert hna.fetch_acs_profile(hna.county_geo("001"), "", 2023) is None
+
+
+# ---------------------------------------------------------------------------
+# On-disk response cache
+# ---------------------------------------------------------------------------
+
+
+def test_cache_round_trip(tmp_path):
+    key = ("census", "acs/acs5/profile", 2023, "NAME", "county:001")
+    value = [["NAME", "county"], ["Adams", "001"]]
+    hna._cache_set(key, value, cache_dir=str(tmp_path))
+    assert hna._cache_get(key, cache_dir=str(tmp_path)) == value
+    assert hna._cache_get(("other",), cache_dir=str(tmp_path)) is None
+
+
+def test_cache_get_honours_ttl(tmp_path):
+    hna._cache_set("k", [1], cache_dir=str(tmp_path))
+    path = hna._cache_path("k", str(tmp_path))
+    stale = time.time() - 3600
+    os.utime(path, (stale, stale))
+    assert hna._cache_get("k", ttl=7200, cache_dir=str(tmp_path)) == [1]
+    assert hna._cache_get("k", ttl=60, cache_dir=str(tmp_path)) is None
+    assert hna._cache_get("k", cache_dir=str(tmp_path)) == [1]
+
+
+def test_cache_set_writes_atomically(tmp_path):
+    hna._cache_set("k", [1], cache_dir=str(tmp_path))
+    hna._cache_set("k", [2], cache_dir=str(tmp_path))
+    assert os.listdir(tmp_path) == [os.path.basename(hna._cache_path("k"))]
+    assert hna._cache_get("k", cache_dir=str(tmp_path)) == [2]
+
+
+def test_cache_set_failure_keeps_previous_value(tmp_path):
+    hna._cache_set("k", [1], cache_dir=str(tmp_path))
+    hna._cache_set("k", object(), cache_dir=str(tmp_path))  # not JSON
+    assert len(os.listdir(tmp_path)) == 1
+    assert hna._cache_get("k", cache_dir=str(tmp_path)) == [1]
+
+
+def test_cache_get_ignores_corrupt_file(tmp_path):
+    path = hna._cache_path("k", str(tmp_path))
+    with open(path, "w") as fh:
+        fh.write("{not json")
+    assert hna._cache_get("k", cache_dir=str(tmp_path)) is None
+
+
+# ---------------------------------------------------------------------------
+# Concurrent ACS profile fetches
+# ---------------------------------------------------------------------------
+
+
+def _acs_transport(ok_dataset, calls, delay=0.05):
+    """Census stub answering only *ok_dataset*; records (county, dataset)."""
+    state = {"in_flight": 0, "peak": 0}
+
+    async def handler(request):
+        county = request.url.params["for"].split(":")[1]
+        dataset = request.url.path.split("/", 3)[3]
+        calls.append((county, dataset))
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        await asyncio.sleep(delay)
+        state["in_flight"] -= 1
+        if dataset != ok_dataset:
+            return httpx.Response(204)
+        return httpx.Response(200, json=[["DP05_0001E", "state", "county"],
+                                         ["100", "08", county]])
+
+    return httpx.MockTransport(handler), state
+
+
+def test_fetch_acs_profiles_by_county_runs_counties_concurrently(
+        tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = []
+    transport, state = _acs_transport("acs/acs5/profile", calls)
+    counties = ["001", "003", "005"]
+
+    profiles = hna.fetch_acs_profiles_by_county(
+        counties, ["DP05_0001E"], 2023, transport=transport)
+
+    assert sorted(profiles) == counties
+    assert profiles["003"][1] == ["100", "08", "003"]
+    assert state["peak"] == len(counties)
+    for county in counties:
+        assert [d for c, d in calls if c == county] == [
+            "acs/acs1/profile", "acs/acs1/subject", "acs/acs5/profile"]
+
+
+def test_fetch_acs_profiles_by_county_omits_exhausted_counties(
+        tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = []
+    transport, _ = _acs_transport(None, calls, delay=0)
+
+    profiles = hna.fetch_acs_profiles_by_county(
+        ["001"], ["DP05_0001E"], 2023, transport=transport)
+
+    assert profiles == {}
+    assert [d for _, d in calls] == list(hna.ACS_PROFILE_DATASETS)
+
+
+# ---------------------------------------------------------------------------
+# CSV banner detection
+# ---------------------------------------------------------------------------
+
+
+def test_count_banner_rows_stops_at_header():
+    lines = ["Vintage 2023 county estimates", '"Note: provisional"',
+             "# generated", "county,age,total", "Source: not a banner here"]
+    assert hna._count_banner_rows(lines) == 3
+
+
+def test_count_banner_rows_no_banner():
+    assert hna._count_banner_rows(["county,age", "Adams,0"]) == 0
+    assert hna._count_banner_rows(["001,0,10"]) == 0
+    assert hna._count_banner_rows([]) == 0
+
+
+def test_read_csv_with_banner_skip(tmp_path):
+    path = tmp_path / "sya.csv"
+    path.write_text("Vintage 2023 estimates\nSource: DOLA\n"
+                    "county,age,total\nAdams,0,10\nDenver,1,20\n")
+    df = hna.read_csv_with_banner_skip(str(path))
+    assert list(df.columns) == ["county", "age", "total"]
+    assert df["total"].tolist() == [10, 20]
+
+
+def test_read_csv_with_banner_skip_without_newline_in_head(tmp_path):
+    # A single line longer than the sniff window must not be over-read
+    path = tmp_path / "wide.csv"
+    header = ",".join(f"c{i}" for i in range(hna.BANNER_SNIFF_BYTES))
+    path.write_text(header + "\n" + ",".join("1" * hna.BANNER_SNIFF_BYTES))
+    df = hna.read_csv_with_banner_skip(str(path))
+    assert df.shape == (1, hna.BANNER_SNIFF_BYTES)
+
+
+# ---------------------------------------------------------------------------
+# DOLA download: ETag-based skip
+# ---------------------------------------------------------------------------
+
+
+class _FakeResponse:
+    def __init__(self, body=b"", headers=None):
+        self.headers = headers or {}
+        self.raw = io.BytesIO(body)
+
+    def raise_for_status(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def dola_env(tmp_path, monkeypatch):
+    """Run DOLA downloads against a fake session inside *tmp_path*."""
+    monkeypatch.chdir(tmp_path)
+    calls = {"get": 0}
+    state = {"etag": '"v1"', "body": b"county,age\nadams,0\n"}
+
+    def fake_head(url, **kwargs):
+        return _FakeResponse(headers={"ETag": state["etag"]})
+
+    def fake_get(url, **kwargs):
+        calls["get"] += 1
+        etag = state.get("get_etag", state["etag"])
+        return _FakeResponse(state["body"], {"ETag": etag} if etag else {})
+
+    monkeypatch.setattr(hna._SESSION, "head", fake_head)
+    monkeypatch.setattr(hna._SESSION, "get", fake_get)
+    return str(tmp_path / "dola.csv"), state, calls
+
+
+def test_download_dola_sya_skips_unchanged_etag(dola_env):
+    dest, state, calls = dola_env
+    assert hna.download_dola_sya(dest)
+    assert calls["get"] == 1
+    assert hna.download_dola_sya(dest)
+    assert calls["get"] == 1
+    assert not os.path.exists(dest + ".part")
+
+
+def test_download_dola_sya_refetches_changed_etag(dola_env):
+    dest, state, calls = dola_env
+    assert hna.download_dola_sya(dest)
+    state["etag"], state["body"] = '"v2"', b"county,age\ndenver,1\n"
+    assert hna.download_dola_sya(dest)
+    assert calls["get"] == 2
+    with open(dest, "rb") as fh:
+        assert fh.read() == state["body"]
+
+
+def test_download_dola_sya_clears_validator_when_response_has_none(dola_env):
+    dest, state, calls = dola_env
+    assert hna.download_dola_sya(dest)
+    state["etag"], state["get_etag"] = '"v2"', None
+    assert hna.download_dola_sya(dest)
+    # The copy on disk no longer corresponds to "v1"
+    state["etag"] = '"v1"'
+    assert hna.download_dola_sya(dest)
+    assert calls["get"] == 3
+
+
+def test_download_dola_sya_redownloads_missing_file(dola_env):
+    dest, state, calls = dola_env
+    assert hna.download_dola_sya(dest)
+    os.remove(dest)
+    assert hna.download_dola_sya(dest)
+    assert calls["get"] == 2
+
+
+class _TrickleRaw(io.RawIOBase):
+    """Raw stream returning at most three bytes per read, like a slow socket."""
+
+    def __init__(self, data):
+        self._data = data
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        out, self._data = self._data[:3], self._data[3:]
+        return out
+
+
+def test_stream_dola_sya_counts_banners_across_short_reads(monkeypatch):
+    body = (b"Vintage 2023 county estimates\n"
+            b"Note: provisional\n"
+            b"county,age,total\n"
+            b"Adams,0,10\n")
+    resp = _FakeResponse()
+    resp.raw = _TrickleRaw(body)
+    monkeypatch.setattr(hna._SESSION, "get", lambda url, **kwargs: resp)
+    df = hna._stream_dola_sya()
+    assert list(df.columns) == ["county", "age", "total"]
+    assert df["total"].tolist() == [10]
+
+
+# ---------------------------------------------------------------------------
+# DOLA SYA county filter
+# ---------------------------------------------------------------------------
+
+
+def test_categorize_county_handles_object_and_str_columns():
+    for dtype in (object, "str"):
+        df = pd.DataFrame({"county": pd.Series(["Adams", None], dtype=dtype)})
+        df = hna._categorize_county(df)
+        assert isinstance(df["county"].dtype, pd.CategoricalDtype)
+        assert list(df["county"].cat.categories) == ["adams"]
+
+
+def test_build_dola_sya_by_county_matches_case_insensitively():
+    df = hna._categorize_county(pd.DataFrame({
+        "county": ["Adams", "Denver", "adams"], "total": [1, 2, 3],
+    }))
+    assert hna.build_dola_sya_by_county("ADAMS", df)["total"].tolist() == [1, 3]
+    assert hna.build_dola_sya_by_county("Boulder", df).empty
+
+
+def test_build_dola_sya_by_county_returns_independent_frame():
+    df = pd.DataFrame({"county": ["Adams", "Denver"], "total": [1, 2]})
+    out = hna.build_dola_sya_by_county("Adams", df)
+    out.loc[:, "total"] = 99
+    assert df["total"].tolist() == [1, 2]
+
+
+# ---------------------------------------------------------------------------
+# Concurrent LEHD downloads
+# ---------------------------------------------------------------------------
+
+
+def _lehd_download(tmp_path, responses):
+    """Download one LEHD file through a mock transport serving *responses*."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return responses[min(len(calls), len(responses)) - 1]
+
+    async def run():
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await hna.download_lehd_async(client, "CO", 2021,
+                                                 str(tmp_path))
+
+    return asyncio.run(run()), calls
+
+
+def test_download_lehd_async_retries_server_errors(tmp_path):
+    path, calls = _lehd_download(tmp_path, [httpx.Response(503),
+                                            httpx.Response(200, content=b"gz")])
+    assert len(calls) == 2
+    with open(path, "rb") as fh:
+        assert fh.read() == b"gz"
+
+
+def test_download_lehd_async_failure_removes_partial_file(tmp_path):
+    with pytest.raises(httpx.HTTPStatusError):
+        _lehd_download(tmp_path, [httpx.Response(404)])
+    assert os.listdir(tmp_path) == []
+
+
+
+def test_download_lehd_states_failure_cleans_up_sibling_downloads(tmp_path):
+    started = asyncio.Event()
+
+    async def slow_body():
+        yield b"partial"
+        started.set()
+        await asyncio.sleep(60)
+        yield b"never"
+
+    async def handler(request):
+        if "/co/" in request.url.path:
+            await started.wait()
+            return httpx.Response(404)
+        return httpx.Response(200, content=slow_body())
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(hna._download_lehd_states_async(
+            ["CO", "WY"], 2021, str(tmp_path), httpx.MockTransport(handler)))
+    assert started.is_set()
+    assert os.listdir(tmp_path) == []
+
+# ---------------------------------------------------------------------------
+# LEHD WAC readers
+# ---------------------------------------------------------------------------
+
+
+def _write_wac(path, ctys):
+    """Write a small gzipped WAC file with one block per entry in *ctys*."""
+    columns = ["w_geocode"] + hna.LEHD_WAC_COUNT_COLUMNS + ["cty", "createdate"]
+    rows = [",".join([f"{cty}{i:010d}"]
+                     + [str(i)] * len(hna.LEHD_WAC_COUNT_COLUMNS)
+                     + [cty, "20230101"])
+            for i, cty in enumerate(ctys)]
+    with gzip.open(path, "wt") as fh:
+        fh.write("\n".join([",".join(columns)] + rows) + "\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("with_pyarrow", [True, False])
+@pytest.mark.parametrize("county", ["08001", "08003", "08999"])
+def test_chunked_lehd_matches_full_read(tmp_path, monkeypatch, with_pyarrow,
+                                        county):
+    if not with_pyarrow:
+        monkeypatch.setattr(hna, "pa", None)
+    path = _write_wac(tmp_path / "co_wac.csv.gz",
+                      ["08001", "08003", "08001", "08005", "08001"])
+    expected = hna.build_lehd_by_county(county, path)
+    for chunksize in (1, 2, 100):
+        actual = hna.build_lehd_by_county_chunked(county, path, chunksize)
+        pd.testing.assert_frame_equal(actual, expected)
+
+
+@pytest.mark.parametrize("with_pyarrow", [True, False])
+def test_split_lehd_by_all_counties_matches_per_county_build(
+        tmp_path, monkeypatch, with_pyarrow):
+    if not with_pyarrow:
+        monkeypatch.setattr(hna, "pa", None)
+    path = _write_wac(tmp_path / "co_wac.csv.gz",
+                      ["08001", "08003", "08001", "08005"])
+    by_county = hna.split_lehd_by_all_counties(hna.load_lehd_wac(path))
+    assert sorted(by_county) == ["08001", "08003", "08005"]
+    for fips, frame in by_county.items():
+        expected = hna.build_lehd_by_county(fips, path)
+        pd.testing.assert_frame_equal(frame.reset_index(drop=True),
+                                      expected.reset_index(drop=True))